@@ -7,9 +7,15 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pv
+from matplotlib.figure import Figure
+import io
+import os
+import uuid
 import warnings
+from pathlib import Path
 warnings.filterwarnings('ignore')
 
 # ===============================
@@ -24,34 +30,198 @@ st.set_page_config(
 # ===============================
 # SAFE DATA LOADING
 # ===============================
-@st.cache_data
-def load_data():
+DATA_PATH = "openfoodfacts_nutrition_final_2025-12-10.csv"
+CACHE_PATH = Path("openfoodfacts_cleaned.parquet")
+NUMERIC_COLS = ['nova_group', 'energy-kcal_100g', 'fat_100g', 'sugars_100g', 'proteins_100g']
+CATEGORY_COLS = ['nutriscore_grade', 'ecoscore_grade', 'main_country', 'main_category', 'brands']
+# CSV columns the cleaning step reads; ingredients_text and the other nutrients are never parsed
+RAW_COLS = [
+    'product_name', 'brands', 'countries', 'categories', 'labels',
+    'nutriscore_grade', 'ecoscore_grade'
+] + NUMERIC_COLS
+# Everything the filters, metrics, charts and preview read; the rest is dropped after cleaning
+USED_COLS = [
+    'product_name', 'brands', 'main_country', 'main_category', 'nutriscore_grade', 'ecoscore_grade',
+    'nova_group', 'nutri_score', 'eco_score', 'is_organic',
+    'sugars_100g', 'fat_100g', 'proteins_100g', 'energy-kcal_100g'
+]
+NOVA_DTYPE = pd.CategoricalDtype([1, 2, 3, 4], ordered=True)
+
+def read_dataset(path):
+    # Multi-threaded Arrow parser; numeric columns are typed at parse time and
+    # rows with the wrong number of fields are skipped
+    parse_options = pv.ParseOptions(invalid_row_handler=lambda row: 'skip')
+    try:
+        return pv.read_csv(
+            path,
+            parse_options=parse_options,
+            convert_options=pv.ConvertOptions(
+                column_types={col: pa.float32() for col in NUMERIC_COLS},
+                include_columns=RAW_COLS,
+                strings_can_be_null=True
+            )
+        )
+    except pa.ArrowInvalid:
+        # A non-numeric cell: read those columns as text and coerce only them
+        table = pv.read_csv(
+            path,
+            parse_options=parse_options,
+            convert_options=pv.ConvertOptions(
+                column_types={col: pa.string() for col in NUMERIC_COLS},
+                include_columns=RAW_COLS,
+                strings_can_be_null=True
+            )
+        )
+        for col in NUMERIC_COLS:
+            values = pd.to_numeric(table[col].to_pandas(), errors='coerce').astype('float32')
+            table = table.set_column(table.schema.get_field_index(col), col, pa.array(values))
+        return table
+
+def first_item(col):
+    # Only the first comma matters, so stop splitting there
+    parts = pc.split_pattern(col, pattern=',', max_splits=1)
+    return pc.utf8_trim_whitespace(pc.list_element(parts, 0))
+
+GRADE_SCORES = {'a': 5, 'b': 4, 'c': 3, 'd': 2, 'e': 1}
+
+def grade_to_score(grades):
+    # Score each category once and broadcast through the integer codes;
+    # 'unknown', 'a-plus', ... and missing grades (code -1 hits the trailing 0) map to NA
+    lut = np.array([GRADE_SCORES.get(g, 0) for g in grades.cat.categories] + [0], dtype=np.int8)
+    scores = lut[grades.cat.codes.to_numpy()]
+    return pd.arrays.IntegerArray(scores, scores == 0)
+
+def clean_data():
+    # Cleaned Parquet sidecar survives restarts; rebuilt when the CSV or this script changes
+    sources = [Path(DATA_PATH), Path(__file__)]
+    if CACHE_PATH.exists() and all(
+        CACHE_PATH.stat().st_mtime > src.stat().st_mtime for src in sources if src.exists()
+    ):
+        try:
+            df = pd.read_parquet(CACHE_PATH, engine="pyarrow", columns=USED_COLS)
+            # Parquet keeps string categoricals but not integer ones
+            df['nova_group'] = df['nova_group'].astype(NOVA_DTYPE)
+            return df
+        except (OSError, ValueError, KeyError):
+            # Unreadable or stale sidecar: drop it and rebuild from the CSV
+            try:
+                CACHE_PATH.unlink(missing_ok=True)
+            except OSError:
+                pass
+
     try:
-        df = pd.read_csv("openfoodfacts_nutrition_final_2025-12-10.csv")
+        table = read_dataset(DATA_PATH)
     except:
         st.error("❌ Dataset not found. Upload CSV to the app folder.")
         st.stop()
+    # Only the columns kept as-is cross into pandas; every other column below is
+    # derived straight from the Arrow table, so each one is converted once
+    df = table.select(['product_name', 'brands'] + NUMERIC_COLS).to_pandas()
 
     # Cleaning
-    df['nutriscore_grade'] = df['nutriscore_grade'].astype(str).str.lower()
-    df['ecoscore_grade'] = df['ecoscore_grade'].astype(str).str.lower()
-    df['nova_group'] = pd.to_numeric(df['nova_group'], errors='coerce')
-
-    for col in ['energy-kcal_100g', 'fat_100g', 'sugars_100g', 'proteins_100g']:
-        df[col] = pd.to_numeric(df[col], errors='coerce')
-
-    df['main_country'] = df['countries'].str.split(',').str[0].str.strip()
-    df['main_category'] = df['categories'].str.split(',').str[0].str.strip()
-    df['is_organic'] = df['labels'].astype(str).str.contains('organic', case=False)
-
-    nutri_map = {'a':5, 'b':4, 'c':3, 'd':2, 'e':1}
-    eco_map = {'a':5, 'b':4, 'c':3, 'd':2, 'e':1}
-    df['nutri_score'] = df['nutriscore_grade'].map(nutri_map)
-    df['eco_score'] = df['ecoscore_grade'].map(eco_map)
+    df['nutriscore_grade'] = pc.utf8_lower(table['nutriscore_grade']).to_pandas()
+    df['ecoscore_grade'] = pc.utf8_lower(table['ecoscore_grade']).to_pandas()
+
+    df['main_country'] = first_item(table['countries']).to_pandas()
+    df['main_category'] = first_item(table['categories']).to_pandas()
+    df['is_organic'] = pc.match_substring(
+        table['labels'], 'organic', ignore_case=True
+    ).fill_null(False).to_numpy()
+
+    # Group/filter columns as categoricals so groupby, value_counts and isin work on int codes
+    for col in CATEGORY_COLS:
+        df[col] = df[col].astype('category')
+    df['nova_group'] = df['nova_group'].astype(NOVA_DTYPE)
+
+    df['nutri_score'] = grade_to_score(df['nutriscore_grade'])
+    df['eco_score'] = grade_to_score(df['ecoscore_grade'])
+    df = df[USED_COLS]
+
+    # Write to a temp file next to the cache and swap it in, so a failed write
+    # never leaves a truncated sidecar that looks newer than the CSV
+    tmp_path = CACHE_PATH.with_name(f"{CACHE_PATH.name}.{uuid.uuid4().hex}.tmp")
+    try:
+        df.to_parquet(tmp_path, engine="pyarrow", compression="snappy")
+        os.replace(tmp_path, CACHE_PATH)
+    except OSError:
+        # read-only app folder or full disk: fall back to re-parsing on the next cold start
+        try:
+            tmp_path.unlink(missing_ok=True)
+        except OSError:
+            pass
 
     return df
 
-df = load_data()
+@st.cache_data
+def load_data():
+    df = clean_data()
+    # Sidebar option lists, derived once with the cached frame; categorical
+    # categories are already sorted and only hold countries present in the data
+    all_countries = df['main_country'].cat.categories.tolist()
+    top_countries = df['main_country'].value_counts().head(20).index.tolist()
+    top_categories = df['main_category'].value_counts().head(15).index.tolist()
+    return df, all_countries, top_countries, top_categories
+
+df, all_countries, top_countries, top_categories = load_data()
+
+# ===============================
+# PLOT HELPERS
+# ===============================
+def render_png(fig):
+    # Rasterise once inside the cached chart function (same settings as
+    # st.pyplot) so reruns only ship the stored PNG bytes
+    buf = io.BytesIO()
+    fig.savefig(buf, format='png', dpi=200, bbox_inches='tight')
+    return buf.getvalue()
+
+def group_quantiles(codes, values, n_groups, qs):
+    # One lexsort by (group code, value); each quantile is then an index into
+    # that group's sorted run, interpolated linearly like pandas' default
+    sorted_vals = values[np.lexsort((values, codes))]
+    counts = np.bincount(codes, minlength=n_groups)
+    starts = np.cumsum(counts) - counts
+    pos = starts[:, None] + np.asarray(qs)[None, :] * (counts[:, None] - 1)
+    lo = np.floor(pos).astype(np.int64)
+    hi = np.ceil(pos).astype(np.int64)
+    return sorted_vals[lo] + (sorted_vals[hi] - sorted_vals[lo]) * (pos - lo)
+
+def box_stats(frame, by, col):
+    # Per-group summaries for ax.bxp; whiskers follow the 1.5 x IQR rule
+    sub = frame[[by, col]].dropna()
+    if sub.empty:
+        return []
+    codes, labels = pd.factorize(sub[by], sort=True)
+    values = sub[col].to_numpy(dtype=np.float32)
+    q1, med, q3 = group_quantiles(codes, values, len(labels), [.25, .5, .75]).T
+    iqr = q3 - q1
+    inside = (values >= (q1 - 1.5 * iqr)[codes]) & (values <= (q3 + 1.5 * iqr)[codes])
+    whislo = np.full(len(labels), np.inf)
+    whishi = np.full(len(labels), -np.inf)
+    np.minimum.at(whislo, codes[inside], values[inside])
+    np.maximum.at(whishi, codes[inside], values[inside])
+    return [
+        {'label': label, 'q1': q1[i], 'med': med[i], 'q3': q3[i], 'whislo': whislo[i], 'whishi': whishi[i]}
+        for i, label in enumerate(labels)
+    ]
+
+def violin_stats(frame, by, col, points=100):
+    # Binned Gaussian KDE: one histogram per group smoothed by a Scott's-rule
+    # kernel, so the cost no longer scales with rows x evaluation points
+    stats = []
+    sub = frame[[by, col]].dropna()
+    for label, vals in sub.groupby(by, observed=True)[col]:
+        v = vals.to_numpy(dtype=np.float32)
+        counts, edges = np.histogram(v, bins=points)
+        sigma = v.std() * len(v) ** (-1 / 5) / (edges[1] - edges[0])
+        if sigma > 0:
+            kernel = np.exp(-0.5 * (np.arange(-points, points + 1) / sigma) ** 2)
+            counts = np.convolve(counts, kernel)[points:2 * points]
+        stats.append({
+            'coords': (edges[:-1] + edges[1:]) / 2, 'vals': counts,
+            'mean': v.mean(), 'median': np.median(v), 'min': v.min(), 'max': v.max(),
+            'label': label
+        })
+    return stats
 
 # ===============================
 # HEADER
@@ -65,9 +235,6 @@ st.markdown("---")
 # ===============================
 st.sidebar.title("🌍 Country Filter")
 
-all_countries = sorted(df['main_country'].dropna().unique())
-top_countries = df['main_country'].value_counts().head(20).index.tolist()
-
 selected_countries = st.sidebar.multiselect(
     "Select Countries",
     options=all_countries,
@@ -83,7 +250,6 @@ st.sidebar.title("🔧 Additional Filters")
 
 show_organic = st.sidebar.checkbox("Organic Only")
 
-top_categories = df['main_category'].value_counts().head(15).index.tolist()
 selected_category = st.sidebar.selectbox(
     "Category",
     ["All"] + top_categories
@@ -109,140 +275,276 @@ sugar_range = st.sidebar.slider(
 # ===============================
 # APPLY FILTERS
 # ===============================
-filtered_df = df[
-    (df['main_country'].isin(selected_countries)) &
-    (df['nutriscore_grade'].isin(nutri_filter)) &
-    (df['nova_group'].isin(nova_filter)) &
-    (df['sugars_100g'].between(sugar_range[0], sugar_range[1]))
-].copy()
+@st.cache_data(show_spinner=False, max_entries=32)
+def filter_mask(nutri_filter, nova_filter, sugar_range, show_organic, selected_category):
+    # Every non-country filter ANDed into one NumPy mask so rows are copied once;
+    # cached so the filtered rows and the country aggregates share it
+    sugar = df['sugars_100g'].to_numpy()
+    mask = (
+        df['nutriscore_grade'].isin(nutri_filter).to_numpy() &
+        df['nova_group'].isin(nova_filter).to_numpy() &
+        (sugar >= sugar_range[0]) & (sugar <= sugar_range[1])
+    )
+    if show_organic:
+        mask &= df['is_organic'].to_numpy()
+    if selected_category != "All":
+        mask &= (df['main_category'] == selected_category).to_numpy()
+    return mask
+
+# Order-insensitive key: the same selection always hits the same cache entry
+filter_key = (
+    tuple(sorted(selected_countries)), tuple(sorted(nutri_filter)), tuple(sorted(nova_filter)),
+    tuple(sugar_range), show_organic, selected_category
+)
+filter_args = filter_key[1:]
 
-if show_organic:
-    filtered_df = filtered_df[filtered_df['is_organic']]
+@st.cache_data(show_spinner=False, max_entries=32)
+def get_filtered(countries, nutri_filter, nova_filter, sugar_range, show_organic, selected_category):
+    mask = filter_mask(nutri_filter, nova_filter, sugar_range, show_organic, selected_category) & \
+        df['main_country'].isin(countries).to_numpy()
+    return df[mask].reset_index(drop=True)
 
-if selected_category != "All":
-    filtered_df = filtered_df[filtered_df['main_category'] == selected_category]
+filtered_df = get_filtered(*filter_key)
+
+if filtered_df.empty:
+    st.info("ℹ No products match the current filters")
+    st.stop()
+
+# ===============================
+# COUNTRY AGGREGATES
+# ===============================
+@st.cache_data(show_spinner=False, max_entries=32)
+def country_aggregates(nutri_filter, nova_filter, sugar_range, show_organic, selected_category):
+    # Every country under the remaining filters, so changing the country
+    # selection only slices the cached frame
+    mask = filter_mask(nutri_filter, nova_filter, sugar_range, show_organic, selected_category)
+
+    # Both shares in one groupby pass, with the flags built on the masked rows only;
+    # left unsorted because charts 7 and 9 sort by value
+    shares = pd.DataFrame({
+        'high_sugar_pct': df['sugars_100g'][mask].ge(15),
+        'ultra_pct': df['nova_group'][mask].eq(4)
+    })
+    return shares.groupby(df['main_country'][mask], observed=True, sort=False).mean().mul(100)
+
+country_stats = country_aggregates(*filter_args)
+country_stats = country_stats[country_stats.index.isin(selected_countries)]
 
 # ===============================
 # METRICS
 # ===============================
+@st.cache_data(show_spinner=False, max_entries=32)
+def frame_summary(filter_key, _filtered_df):
+    # Metric values and per-chart data checks in one cached lookup
+    return {
+        'products': len(_filtered_df),
+        'avg_nutri': _filtered_df['nutri_score'].mean(),
+        'organic_pct': _filtered_df['is_organic'].mean() * 100,
+        'has_categories': _filtered_df['main_category'].notna().any(),
+        'has_fat_protein': _filtered_df[['fat_100g','proteins_100g']].notna().all(axis=1).any(),
+        'has_calories': _filtered_df['energy-kcal_100g'].notna().any()
+    }
+
+summary = frame_summary(filter_key, filtered_df)
+
 m1, m2, m3, m4 = st.columns(4)
-m1.metric("Products", len(filtered_df))
-m2.metric("Avg Nutri-Score", f"{filtered_df['nutri_score'].mean():.2f}")
-m3.metric("Countries", filtered_df['main_country'].nunique())
-m4.metric("Organic %", f"{filtered_df['is_organic'].mean()*100:.1f}%")
+m1.metric("Products", summary['products'])
+m2.metric("Avg Nutri-Score", f"{summary['avg_nutri']:.2f}" if pd.notna(summary['avg_nutri']) else "–")
+m3.metric("Countries", len(country_stats))
+m4.metric("Organic %", f"{summary['organic_pct']:.1f}%")
 
 st.markdown("---")
 
+# Bar charts go to the browser as Vega specs; the remaining matplotlib charts
+# are cached on filter_key (the frame arguments are skipped by the hasher) as
+# rendered PNG bytes, so a rerun never redraws or re-rasterises them
+
 # ===============================
 # 1. NUTRI-SCORE DISTRIBUTION
 # ===============================
 st.subheader("1️⃣ Nutri-Score Distribution")
-fig, ax = plt.subplots(figsize=(9,5))
-filtered_df['nutriscore_grade'].value_counts().reindex(['a','b','c','d','e']).plot(
-    kind='bar',
-    color=['green','lightgreen','gold','orange','red'],
-    ax=ax
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def grade_counts(filter_key, _filtered_df):
+    # Products per (organic, grade); charts 1 and 8 share this single pass. Key
+    # order is irrelevant: chart 1 reindexes a-e and Vega orders chart 8's axes
+    return _filtered_df.groupby(['is_organic','nutriscore_grade'], observed=True, sort=False).size()
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def nutri_distribution(filter_key, _filtered_df):
+    # One column per grade (diagonal frame) so each bar keeps its own colour
+    counts = grade_counts(filter_key, _filtered_df).groupby(level='nutriscore_grade', observed=True, sort=False).sum() \
+        .reindex(['a','b','c','d','e'], fill_value=0)
+    return pd.DataFrame(np.diag(counts), index=counts.index, columns=counts.index)
+
+st.bar_chart(
+    nutri_distribution(filter_key, filtered_df),
+    y=['a','b','c','d','e'], x_label="Nutri-Score", y_label="Number of Products",
+    color=['#008000', '#90ee90', '#ffd700', '#ffa500', '#ff0000'], stack=True
 )
-ax.set_xlabel("Nutri-Score")
-ax.set_ylabel("Number of Products")
-st.pyplot(fig)
 
 # ===============================
 # 2. TOP BRANDS
 # ===============================
 st.subheader("2️⃣ Top 10 Healthiest Brands")
-top_brands = filtered_df.dropna(subset=['brands','nutri_score']) \
-    .groupby('brands')['nutri_score'].mean().nlargest(10)
-fig, ax = plt.subplots(figsize=(9,5))
-top_brands.plot(kind='barh', ax=ax, color='skyblue')
-ax.set_xlabel("Average Nutri-Score")
-st.pyplot(fig)
+st.caption("Brands with at least 5 rated products")
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def top_brands(filter_key, _filtered_df, min_products=5, k=10):
+    scored = _filtered_df[['brands','nutri_score']].dropna()
+    # Per-brand counts and sums straight from the categorical codes
+    brands = scored['brands'].cat
+    codes = brands.codes.to_numpy()
+    counts = np.bincount(codes, minlength=len(brands.categories))
+    sums = np.bincount(codes, weights=scored['nutri_score'].to_numpy(dtype=np.float64),
+                       minlength=len(brands.categories))
+    # Single-product brands only add spurious perfect means, so prune them before ranking
+    eligible = np.flatnonzero(counts >= min_products)
+    means = sums[eligible] / counts[eligible]
+    if len(means) > k:
+        # Partition for the k-th best mean instead of sorting every brand; ties at
+        # the cut are kept so the stable sort below picks them alphabetically, like nlargest
+        keep = means >= np.partition(means, len(means) - k)[len(means) - k]
+        eligible, means = eligible[keep], means[keep]
+    order = np.argsort(-means, kind='stable')[:k]
+    return pd.DataFrame({
+        'Brand': brands.categories[eligible[order]],
+        'Average Nutri-Score': means[order]
+    })
+
+st.bar_chart(
+    top_brands(filter_key, filtered_df),
+    x='Brand', y='Average Nutri-Score', horizontal=True, sort='-Average Nutri-Score', color='#87ceeb'
+)
 
 # ===============================
 # 3. SUGAR BY CATEGORY
 # ===============================
 st.subheader("3️⃣ Sugar Content by Category")
-top_cat = filtered_df['main_category'].value_counts().head(6).index
-fig, ax = plt.subplots(figsize=(11,5))
-sns.boxplot(
-    data=filtered_df[filtered_df['main_category'].isin(top_cat)],
-    x='main_category', y='sugars_100g', ax=ax
-)
-ax.tick_params(axis='x', rotation=45)
-st.pyplot(fig)
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def sugar_by_category_fig(filter_key, _filtered_df):
+    # Narrow to the two plotted columns before selecting the top categories' rows
+    cat_sugar = _filtered_df[['main_category','sugars_100g']]
+    top_cat = cat_sugar['main_category'].value_counts().head(6).index
+    fig = Figure(figsize=(11,5))
+    ax = fig.subplots()
+    ax.bxp(
+        box_stats(cat_sugar[cat_sugar['main_category'].isin(top_cat)], 'main_category', 'sugars_100g'),
+        showfliers=False, patch_artist=True
+    )
+    ax.set_xlabel("main_category")
+    ax.set_ylabel("sugars_100g")
+    ax.tick_params(axis='x', rotation=45)
+    return render_png(fig)
+
+if summary['has_categories']:
+    st.image(sugar_by_category_fig(filter_key, filtered_df), width="stretch")
+else:
+    st.info("ℹ No category data for the current filters")
 
 # ===============================
 # 4. PROTEIN VS FAT
 # ===============================
 st.subheader("4️⃣ Protein vs Fat Content")
-fig, ax = plt.subplots(figsize=(9,5))
-ax.scatter(filtered_df['fat_100g'], filtered_df['proteins_100g'], alpha=0.6)
-ax.set_xlabel("Fat (g/100g)")
-ax.set_ylabel("Protein (g/100g)")
-st.pyplot(fig)
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def protein_fat_fig(filter_key, _filtered_df):
+    nutr_df = _filtered_df[['fat_100g','proteins_100g']].dropna()
+    fig = Figure(figsize=(9,5))
+    ax = fig.subplots()
+    hb = ax.hexbin(nutr_df['fat_100g'], nutr_df['proteins_100g'], gridsize=40, bins='log', mincnt=1)
+    fig.colorbar(hb, ax=ax, label="Products")
+    ax.set_xlabel("Fat (g/100g)")
+    ax.set_ylabel("Protein (g/100g)")
+    return render_png(fig)
+
+if summary['has_fat_protein']:
+    st.image(protein_fat_fig(filter_key, filtered_df), width="stretch")
+else:
+    st.info("ℹ No fat/protein data for the current filters")
 
 # ===============================
 # 5. NUTRI vs ECO
 # ===============================
 st.subheader("5️⃣ Nutri-Score vs Eco-Score")
-corr_df = filtered_df.dropna(subset=['nutri_score','eco_score'])
-corr_df = corr_df[
-    corr_df['nutri_score'].between(1,5) &
-    corr_df['eco_score'].between(1,5)
-]
-fig, ax = plt.subplots(figsize=(6,5))
-ax.scatter(corr_df['nutri_score'], corr_df['eco_score'], alpha=0.7)
-ax.set_title(f"Correlation r = {corr_df['nutri_score'].corr(corr_df['eco_score']):.3f}")
-ax.set_xlabel("Nutri-Score")
-ax.set_ylabel("Eco-Score")
-st.pyplot(fig)
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def nutri_eco_fig(filter_key, _filtered_df):
+    corr_df = _filtered_df[['nutri_score','eco_score']].dropna()
+    nutri = corr_df['nutri_score'].to_numpy(dtype=np.int64)
+    eco = corr_df['eco_score'].to_numpy(dtype=np.int64)
+    # Both scores are 1-5 by construction, so the 5x5 crosstab is one bincount
+    score_counts = np.bincount((eco - 1) * 5 + (nutri - 1), minlength=25).reshape(5, 5)
+    fig = Figure(figsize=(6,5))
+    ax = fig.subplots()
+    im = ax.imshow(score_counts, origin='lower', extent=(0.5, 5.5, 0.5, 5.5), cmap='Blues')
+    fig.colorbar(im, ax=ax, label="Products")
+    ax.set_title(f"Correlation r = {np.corrcoef(nutri, eco)[0, 1]:.3f}")
+    ax.set_xlabel("Nutri-Score")
+    ax.set_ylabel("Eco-Score")
+    return render_png(fig)
+
+st.image(nutri_eco_fig(filter_key, filtered_df), width="stretch")
 
 # ===============================
 # 6. CALORIES BY NOVA
 # ===============================
 st.subheader("6️⃣ Calories by Processing Level (NOVA)")
-fig, ax = plt.subplots(figsize=(9,5))
-sns.violinplot(
-    data=filtered_df.dropna(subset=['nova_group','energy-kcal_100g']),
-    x='nova_group', y='energy-kcal_100g', ax=ax
-)
-ax.set_xlabel("NOVA Group (1=Unprocessed, 4=Ultra-processed)")
-ax.set_ylabel("Calories / 100g")
-st.pyplot(fig)
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def calories_by_nova_fig(filter_key, _filtered_df):
+    fig = Figure(figsize=(9,5))
+    ax = fig.subplots()
+    nova_violins = violin_stats(_filtered_df, 'nova_group', 'energy-kcal_100g')
+    ax.violin(nova_violins, positions=range(len(nova_violins)), showmedians=True)
+    ax.set_xticks(range(len(nova_violins)), [v['label'] for v in nova_violins])
+    ax.set_xlabel("NOVA Group (1=Unprocessed, 4=Ultra-processed)")
+    ax.set_ylabel("Calories / 100g")
+    return render_png(fig)
+
+if summary['has_calories']:
+    st.image(calories_by_nova_fig(filter_key, filtered_df), width="stretch")
+else:
+    st.info("ℹ No calorie data for the current filters")
 
 # ===============================
 # 7. HIGH SUGAR COUNTRIES
 # ===============================
 st.subheader("7️⃣ High-Sugar Products by Country")
-high_sugar = filtered_df['sugars_100g'] >= 15
-country_high = high_sugar.groupby(filtered_df['main_country']).mean() * 100
-fig, ax = plt.subplots(figsize=(9,5))
-country_high.sort_values().plot(kind='barh', ax=ax, color='salmon')
-ax.set_xlabel("% High Sugar Products")
-st.pyplot(fig)
+
+st.bar_chart(
+    country_stats['high_sugar_pct'].rename_axis('Country').rename('% High Sugar Products').reset_index(),
+    x='Country', y='% High Sugar Products', horizontal=True, sort='-% High Sugar Products', color='#fa8072'
+)
 
 # ===============================
 # 8. ORGANIC VS NUTRI
 # ===============================
 st.subheader("8️⃣ Organic vs Nutri-Score")
-fig, ax = plt.subplots(figsize=(9,5))
-filtered_df.groupby(['is_organic','nutriscore_grade']).size().unstack(fill_value=0).plot(
-    kind='bar', ax=ax
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def organic_nutri(filter_key, _filtered_df):
+    counts = grade_counts(filter_key, _filtered_df).rename('Number of Products').reset_index()
+    return counts.assign(
+        Organic=counts['is_organic'].astype(str),
+        **{'Nutri-Score': counts['nutriscore_grade'].astype(str)}
+    )
+
+st.bar_chart(
+    organic_nutri(filter_key, filtered_df),
+    x='Organic', y='Number of Products', color='Nutri-Score', stack=False
 )
-ax.set_xlabel("Nutri-Score")
-ax.set_ylabel("Number of Products")
-st.pyplot(fig)
 
 # ===============================
 # 9. ULTRA-PROCESSED SHARE
 # ===============================
 st.subheader("9️⃣ Ultra-Processed Food Share")
-ultra_pct = filtered_df.groupby('main_country')['nova_group'] \
-    .apply(lambda x: (x==4).mean()*100)
-fig, ax = plt.subplots(figsize=(9,5))
-ultra_pct.sort_values().plot(kind='barh', ax=ax, color='purple')
-ax.set_xlabel("% Ultra-Processed")
-st.pyplot(fig)
+
+st.bar_chart(
+    country_stats['ultra_pct'].rename_axis('Country').rename('% Ultra-Processed').reset_index(),
+    x='Country', y='% Ultra-Processed', horizontal=True, sort='-% Ultra-Processed', color='#800080'
+)
 
 # ===============================
 # DATA PREVIEW